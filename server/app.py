@@ -1,4 +1,5 @@
 from flask import Flask, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import logging
 from logging.handlers import RotatingFileHandler
@@ -7,6 +8,11 @@ from logging.handlers import RotatingFileHandler
 from .routes.upload import upload_bp
 from .routes.download import download_bp
 from .routes.ids import ids_bp
+from .routes.metrics import metrics_bp
+from .security.admission import AdmissionController
+from .security.ioc import IOCStore
+from .storage.backend import FileStorageBackend
+from .utils.static_assets import StaticAssetCache, serve_static_asset
 
 
 # --- Setup Secure Logging ---
@@ -42,15 +48,59 @@ intrusion_logger.addFilter(IPFilter())
 # ---------------------
 
 # --- Flask App Initialization ---
-# Point specific static folder to frontend build
-app = Flask(__name__, static_folder='../frontend/build', static_url_path='/')
+# The React build is served from memory by StaticAssetCache, not Flask's static folder
+app = Flask(__name__, static_folder=None)
+app.config['STATIC_BUILD_DIR'] = os.path.join(app.root_path, '..', 'frontend', 'build')
 app.config['SECRET_KEY'] = os.urandom(24)
 app.config['UPLOAD_FOLDER'] = 'storage/encrypted_files'
 app.config['SANDBOX_API_URL'] = 'http://127.0.0.1:8090'
 app.config['DB_PATH'] = 'server/database/file_metadata.db'
-
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+# Largest accepted request body; larger uploads get 413 before any work is done
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024
+app.config['IOC_TABLE_PATH'] = 'storage/ioc/sha256.ioc'
+app.config['IOC_REFRESH_INTERVAL'] = 60  # seconds between checks for a refreshed table
+
+# Admission control for the RSA/AES work in upload and download.
+# A request costs 1 unit + 1 per ADMISSION_UNIT_BYTES of payload.
+app.config['ADMISSION_CAPACITY'] = 8 * (os.cpu_count() or 1)
+app.config['ADMISSION_UNIT_BYTES'] = 1024 * 1024
+app.config['ADMISSION_MAX_QUEUE'] = 32
+app.config['ADMISSION_QUEUE_TIMEOUT'] = 5  # seconds a request may wait for a slot
+app.config['ADMISSION_PER_CLIENT'] = 4  # running + queued requests per client IP
+app.config['ADMISSION_RETRY_AFTER'] = 1  # minimum Retry-After (seconds) on rejection
+# Number of reverse proxies in front of the app whose X-Forwarded-For is trusted.
+# 0 (default) keys per-client quotas on the socket address only. Set from the
+# environment, e.g. TRUSTED_PROXY_HOPS=1 for tools/replay_traffic.py.
+app.config['TRUSTED_PROXY_HOPS'] = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'])
+
+# --- Static Assets ---
+# Loads the build (with gzip/brotli variants and ETags) into memory once at startup
+app.extensions['static_assets'] = StaticAssetCache(app.config['STATIC_BUILD_DIR'])
+
+# --- Storage Backend ---
+# Creates UPLOAD_FOLDER if needed; routes reach it via server.storage.backend.get_backend()
+app.extensions['storage'] = FileStorageBackend(app.config['UPLOAD_FOLDER'])
+# The scrubber runs as its own process: python -m server.storage.scrubber
+
+# --- IOC Blocklist ---
+# Maps the table at startup; a missing file behaves as an empty blocklist
+app.extensions['ioc'] = IOCStore(
+    app.config['IOC_TABLE_PATH'],
+    refresh_interval=app.config['IOC_REFRESH_INTERVAL']
+)
+
+# --- Admission Controller ---
+app.extensions['admission'] = AdmissionController(
+    capacity=app.config['ADMISSION_CAPACITY'],
+    unit_bytes=app.config['ADMISSION_UNIT_BYTES'],
+    max_queue=app.config['ADMISSION_MAX_QUEUE'],
+    queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT'],
+    per_client_limit=app.config['ADMISSION_PER_CLIENT'],
+    retry_after=app.config['ADMISSION_RETRY_AFTER']
+)
 
 # --- Middleware for Logging ---
 @app.before_request
@@ -61,13 +111,19 @@ def log_request_info():
 app.register_blueprint(upload_bp)
 app.register_blueprint(download_bp)
 app.register_blueprint(ids_bp)
+app.register_blueprint(metrics_bp)
 
 
 # --- Main App Routes ---
 @app.route('/')
 def index():
-    # Serve the React App's index.html
-    return app.send_static_file('index.html')
+    # Serve the React App's index.html (revalidated on every load via its ETag)
+    return serve_static_asset('index.html')
+
+@app.route('/<path:filename>')
+def static_asset(filename):
+    # Hashed bundles are served with long-lived immutable cache headers
+    return serve_static_asset(filename)
 
 # Removed /keys route as it was template-based. API should handle keys if needed.
 
@@ -1,6 +1,4 @@
-from flask import (Blueprint, request, current_app, jsonify, send_file)
-import os
-import json
+from flask import (Blueprint, request, jsonify, send_file)
 import base64
 from io import BytesIO
 from logging import getLogger
@@ -10,14 +8,25 @@ from client.crypto_utils import (
     decrypt_file_aes, decrypt_key_rsa,
     verify_signature, hash_data, load_public_key, load_private_key
 )
+from server.security.admission import admission_controlled
+from server.storage.backend import get_backend
+from server.storage.container import CONTAINER_EXT, ContainerError, envelope_to_json
 
 download_bp = Blueprint('download_bp', __name__)
 
 intrusion_logger = getLogger('intrusion')
 
+def _object_id(filename):
+    # Accept the bare envelope_id as well as the legacy ".json" or container suffix
+    for suffix in ('.json', CONTAINER_EXT):
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
 @download_bp.route('/api/file/download/<filename>', methods=['GET'])
+@admission_controlled(lambda filename: get_backend().size(_object_id(filename)))
 def api_download(filename):
-    upload_folder = current_app.config['UPLOAD_FOLDER']
+    backend = get_backend()
     
     # We assume 'filename' passed is the base_filename (envelope_id) or the original filename?
     # The instructions say: "Rename the route to /api/file/download/<filename>"
@@ -28,39 +37,31 @@ def api_download(filename):
     # Or maybe the full filename "foo.txt.123456.json".
     # Let's handle it robustly.
     
-    # Check if filename ends with .json, if not, try appending it to find the envelope
-    if not filename.endswith('.json'):
-        envelope_filename = f"{filename}.json"
-    else:
-        envelope_filename = filename
-        
-    envelope_path = os.path.join(upload_folder, envelope_filename)
-    
-    if not os.path.exists(envelope_path):
+    object_id = _object_id(filename)
+
+    try:
+        # Objects still stored as a legacy .json/.data pair are converted on first access
+        found = backend.exists(object_id) or backend.migrate_legacy(object_id)
+    except Exception as e:
+        intrusion_logger.error(f"Could not migrate legacy object {filename}: {e}")
+        return jsonify({'error': 'Stored file is corrupt or unreadable'}), 500
+
+    if not found:
         intrusion_logger.warning(f"Download attempt for non-existent file: {filename}")
         return jsonify({'error': 'File not found'}), 404
 
-    file_data_filename = envelope_filename.replace('.json', '.data')
-    file_data_path = os.path.join(upload_folder, file_data_filename)
-
     try:
         public_key = load_public_key()
         private_key = load_private_key()
 
-        with open(envelope_path, 'r') as f:
-            envelope = json.load(f)
-        
-        if not os.path.exists(file_data_path):
-            intrusion_logger.error(f"Missing data file: {file_data_path}")
-            return jsonify({'error': 'Data file missing'}), 500
-            
-        with open(file_data_path, 'rb') as f:
-            ciphertext = f.read()
+        with backend.open(object_id) as reader:
+            envelope = reader.envelope
+            ciphertext = reader.read_ciphertext()
 
-        encrypted_aes_key = base64.b64decode(envelope['encrypted_aes_key'])
-        nonce = base64.b64decode(envelope['nonce'])
-        tag = base64.b64decode(envelope['tag'])
-        signature = base64.b64decode(envelope['signature'])
+        encrypted_aes_key = envelope['encrypted_aes_key']
+        nonce = envelope['nonce']
+        tag = envelope['tag']
+        signature = envelope['signature']
         original_filename = envelope['original_filename']
 
         aes_key = decrypt_key_rsa(encrypted_aes_key, private_key)
@@ -85,10 +86,14 @@ def api_download(filename):
         return jsonify({
             'status': 'verified',
             'filename': original_filename,
-            'envelope': envelope,
+            'envelope': envelope_to_json(envelope),
             'encrypted_data': base64.b64encode(ciphertext).decode('utf-8')
         })
 
+    except ContainerError as e:
+        # Corrupt or truncated object on disk: a storage fault, not a client error
+        intrusion_logger.error(f"Corrupt stored object {filename}: {e}")
+        return jsonify({'error': 'Stored file is corrupt or unreadable'}), 500
     except ValueError as e:
         intrusion_logger.warning(f"Verification failed for {filename}: {e}")
         return jsonify({'error': f"Verification failed: {str(e)}"}), 400
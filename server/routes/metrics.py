@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify, current_app
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+@metrics_bp.route('/api/metrics/admission', methods=['GET'])
+def get_admission_metrics():
+    # Queue depth, slot usage, rejections and wait-time percentiles
+    return jsonify(current_app.extensions['admission'].metrics())
@@ -1,21 +1,38 @@
-from flask import (Blueprint, request, current_app, jsonify)
+from flask import (Blueprint, request, jsonify)
 import os
 import time
-import base64
 from logging import getLogger
-import json
 
 from client.crypto_utils import (
     generate_aes_key, encrypt_file_aes, encrypt_key_rsa,
     sign_data, hash_data, load_public_key, load_private_key
 )
 from server.security import ids
+from server.security.admission import admission_controlled
+from server.storage.backend import get_backend
 
 upload_bp = Blueprint('upload_bp', __name__)
 
 intrusion_logger = getLogger('intrusion')
 
+def received_upload_size():
+    """
+    Receives the whole request body and returns the uploaded file's actual size.
+
+    Used as the admission weight, so it runs before a slot is taken: a slow sender
+    ties up only its own connection, and chunked uploads (no Content-Length) are
+    weighed on what they really sent. MAX_CONTENT_LENGTH bounds the body.
+    """
+    file = request.files.get('file')
+    if file is None:
+        return 0
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    return size
+
 @upload_bp.route('/api/upload', methods=['POST'])
+@admission_controlled(received_upload_size)
 def api_upload():
     if 'file' not in request.files:
         intrusion_logger.warning("Upload attempt with no file part")
@@ -31,6 +48,13 @@ def api_upload():
             file_data = file.read()
             original_filename = file.filename
 
+            # --- IDS Integration (Exact-Hash IOC Blocklist) ---
+            # Checked before any encryption so known-bad files cost one hash + lookup
+            data_hash = hash_data(file_data)
+            if ids.check_ioc_blocklist(data_hash) == 'IOC_MATCH':
+                intrusion_logger.warning(f"IDS Alert: Blocked upload of known-bad file {original_filename} (sha256 {data_hash.hex()})")
+                return jsonify({'error': 'File rejected by security policy'}), 403
+
             # --- IDS Integration (Fuzzy Hashing) ---
             fuzzy_hash = ids.calculate_fuzzy_hash(file_data)
             threat_status = ids.check_hash_history(fuzzy_hash)
@@ -47,71 +71,34 @@ def api_upload():
             ciphertext, nonce, tag = encrypt_file_aes(file_data, aes_key)
             encrypted_aes_key = encrypt_key_rsa(aes_key, public_key)
 
-            data_hash = hash_data(file_data)
             signature = sign_data(data_hash, private_key)
 
             envelope = {
                 'original_filename': original_filename,
-                'encrypted_aes_key': base64.b64encode(encrypted_aes_key).decode('utf-8'),
-                'nonce': base64.b64encode(nonce).decode('utf-8'),
-                'tag': base64.b64encode(tag).decode('utf-8'),
-                'signature': base64.b64encode(signature).decode('utf-8'),
+                'encrypted_aes_key': encrypted_aes_key,
+                'nonce': nonce,
+                'tag': tag,
+                'signature': signature,
                 'timestamp': int(time.time()),
                 'fuzzy_hash': fuzzy_hash  # Include in envelope? The prompt implies return in JSON, but saving it is good too.
             }
             
-            # Unique filename to prevent overwrites
-            base_filename = f"{original_filename}.{int(time.time())}"
-            envelope_filename = f"{base_filename}.json"
-            file_data_filename = f"{base_filename}.data"
-
-            envelope_path = os.path.join(current_app.config['UPLOAD_FOLDER'], envelope_filename)
-            with open(envelope_path, 'w') as f:
-                json.dump(envelope, f, indent=4)
-
-            file_data_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_data_filename)
-            with open(file_data_path, 'wb') as f:
-                f.write(ciphertext)
+            # Atomic write under a random, sharded object ID (no same-name collisions)
+            backend = get_backend()
+            object_id = backend.put(envelope, ciphertext)
+            file_data_path = backend.path_for(object_id)
 
             # --- IDS Integration (Sandbox Submission) ---
-            # We submit the ENCRYPTED file? Or the raw file?
-            # Cuckoo usually analyzes the raw file. 
-            # The prompt says "submit_to_cuckoo(file_data_path)". 
-            # file_data_path points to the encrypted ciphertext.
-            # "Call ids.submit_to_cuckoo(file_data_path) to get the task_id."
-            # Wait, if I submit the encrypted file, Cuckoo won't be able to analyze it unless it has the key.
-            # But the prompt explicitly says: "Call ids.submit_to_cuckoo(file_data_path)".
-            # Let's strictly follow the prompt. 
-            # Actually, "file_data" variable holds the raw content.
-            # But the prompt says "file_data_path". 
-            # If I look closely at the instructions: "Call ids.submit_to_cuckoo(file_data_path) to get the task_id."
-            # Maybe I should create a temporary raw file?
-            # Or maybe the user INTENDS to submit the encrypted file (which is weird for a sandbox).
-            # However, `file_data` is in memory. `ids.submit_to_cuckoo` takes a file path.
-            # If I pass `file_data_path` (which is encrypted), the sandbox gets garbage.
-            # If I want to verify, I should perhaps NOT overwrite `file_data` with ciphertext?
-            # Ah, the previous code separates `file_data` (read from request) and `ciphertext`.
-            # If I follow "Save the encrypted file data and envelope locally." and then "Call ids.submit_to_cuckoo(file_data_path)", 
-            # it strongly implies submitting the file on disk.
-            # BUT, the file on disk is encrypted.
-            # Let's check the prompt again: "Call ids.submit_to_cuckoo(file_data_path)".
-            # Maybe the user made a mistake and meant a temporary path to the raw file?
-            # OR, maybe they want to test if the sandbox detects the encrypted file's entropy?
-            # I will follow the instruction literally: check if `ids.submit_to_cuckoo` expects a path.
-            # Yes, `ids.py` I wrote takes `file_path`.
-            # So I will pass `file_data_path` (the encrypted one) as per strict instruction, 
-            # OR I can save the raw file temporarily. 
-            # "Save the encrypted file data and envelope locally." -> implies `file_data_path` is encrypted.
-            # I'll stick to the strict instruction: pass `file_data_path`. 
-            # If it were a real app, I'd argue, but here I follow orders.
-            
-            task_id = ids.submit_to_cuckoo(file_data_path)
+            # Only the ciphertext is submitted, under the legacy ".data" name, since
+            # the sandbox has no use for the envelope stored alongside it
+            task_id = ids.submit_to_cuckoo(file_data_path, data=ciphertext,
+                                           filename=f"{object_id}.data")
             # --------------------------------------------
 
             return jsonify({
                 'message': 'File securely encrypted and uploaded',
                 'filename': envelope['original_filename'],
-                'envelope_id': base_filename,
+                'envelope_id': object_id,
                 'task_id': task_id,
                 'fuzzy_hash': fuzzy_hash
             }), 201
@@ -0,0 +1,237 @@
+import math
+import threading
+import time
+from collections import deque
+from functools import wraps
+from logging import getLogger
+
+from flask import current_app, jsonify, request
+
+intrusion_logger = getLogger('intrusion')
+
+# Number of recent wait times kept for the percentile metrics
+_WAIT_SAMPLES = 1024
+
+
+class AdmissionRejected(Exception):
+    """Raised by AdmissionController.acquire() when a request cannot be admitted."""
+
+    def __init__(self, reason, status, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('client', 'weight', 'enqueued')
+
+    def __init__(self, client, weight):
+        self.client = client
+        self.weight = weight
+        self.enqueued = time.monotonic()
+
+
+class _WaitStats:
+    """Count, mean, max and recent-sample percentiles of queue wait times."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=_WAIT_SAMPLES)
+
+    def add(self, waited):
+        self.count += 1
+        self.total += waited
+        self.max = max(self.max, waited)
+        self.samples.append(waited)
+
+    def summary(self):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            'count': self.count,
+            'avg': self.total / self.count if self.count else 0.0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': self.max,
+        }
+
+
+class AdmissionController:
+    """
+    Bounds the CPU-heavy crypto work running at once.
+
+    Capacity is measured in units; a request costs 1 unit plus one per
+    `unit_bytes` of payload, capped at the full capacity so a huge request can
+    still run alone. Requests that do not fit wait in a short queue until
+    `queue_timeout`; when the queue is full they are rejected immediately. Each
+    client may have at most `per_client_limit` requests running or queued.
+
+    The queue is FIFO, but a waiter that fits may run ahead of a head that does
+    not, so small requests are not stuck behind a large one. Once the head has
+    waited `reserve_after` seconds nobody may pass it any more, and the units
+    freed by finishing requests go to the head.
+    """
+
+    def __init__(self, capacity, unit_bytes, max_queue, queue_timeout,
+                 per_client_limit, retry_after=1, reserve_after=None):
+        self.capacity = capacity
+        self.unit_bytes = unit_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.per_client_limit = per_client_limit
+        self.retry_after = retry_after
+        self.reserve_after = queue_timeout / 2 if reserve_after is None else reserve_after
+
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._running = 0
+        self._queue = deque()
+        self._per_client = {}
+
+        self._admitted = 0
+        self._rejected = {'queue_full': 0, 'timeout': 0, 'client_quota': 0}
+        # Waits of every queued request (admitted or timed out), and of timeouts alone
+        self._waits = _WaitStats()
+        self._timeout_waits = _WaitStats()
+
+    def weight_for(self, size):
+        return min(self.capacity, 1 + (size or 0) // self.unit_bytes)
+
+    def _retry_after(self):
+        # Rough time for the current queue to drain, never below the configured floor
+        return max(self.retry_after, math.ceil(len(self._queue) * self.queue_timeout / max(1, self.max_queue)))
+
+    def _reject(self, reason, status):
+        self._rejected[reason] += 1
+        raise AdmissionRejected(reason, status, self._retry_after())
+
+    def _fits(self, weight):
+        return self._in_use + weight <= self.capacity
+
+    def _head_reserved(self):
+        return bool(self._queue) and time.monotonic() - self._queue[0].enqueued >= self.reserve_after
+
+    def _next_runnable(self):
+        """The waiter that should be granted next, or None if none may run now."""
+        head = self._queue[0]
+        if self._fits(head.weight):
+            return head
+        if self._head_reserved():
+            return None
+        for ticket in self._queue:
+            if self._fits(ticket.weight):
+                return ticket
+        return None
+
+    def _grant(self, ticket, queued):
+        self._in_use += ticket.weight
+        self._running += 1
+        self._admitted += 1
+        if queued:
+            self._waits.add(time.monotonic() - ticket.enqueued)
+
+    def _drop_client(self, client):
+        remaining = self._per_client[client] - 1
+        if remaining:
+            self._per_client[client] = remaining
+        else:
+            del self._per_client[client]
+
+    def acquire(self, client, weight):
+        """Blocks until `weight` units are granted. Raises AdmissionRejected otherwise."""
+        with self._cond:
+            if self._per_client.get(client, 0) >= self.per_client_limit:
+                self._reject('client_quota', 429)
+
+            ticket = _Ticket(client, weight)
+            if self._fits(weight) and not self._head_reserved():
+                self._per_client[client] = self._per_client.get(client, 0) + 1
+                self._grant(ticket, queued=False)
+                return
+
+            if len(self._queue) >= self.max_queue:
+                self._reject('queue_full', 503)
+
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            self._queue.append(ticket)
+            deadline = ticket.enqueued + self.queue_timeout
+            while self._next_runnable() is not ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._drop_client(client)
+                    waited = time.monotonic() - ticket.enqueued
+                    self._waits.add(waited)
+                    self._timeout_waits.add(waited)
+                    # The head may have changed; let the other waiters re-check
+                    self._cond.notify_all()
+                    self._reject('timeout', 503)
+                self._cond.wait(remaining)
+
+            self._queue.remove(ticket)
+            self._grant(ticket, queued=True)
+            self._cond.notify_all()
+
+    def release(self, client, weight):
+        with self._cond:
+            self._in_use -= weight
+            self._running -= 1
+            self._drop_client(client)
+            self._cond.notify_all()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'in_use': self._in_use,
+                'running': self._running,
+                'queue_depth': len(self._queue),
+                'max_queue': self.max_queue,
+                'admitted_total': self._admitted,
+                'rejected_total': dict(self._rejected),
+                'wait_seconds': self._waits.summary(),
+                'timeout_wait_seconds': self._timeout_waits.summary(),
+            }
+
+
+def admission_controlled(size_of):
+    """
+    Route decorator that runs the view inside an admission slot.
+
+    `size_of` receives the view's arguments and returns the payload size in
+    bytes, which determines the slot weight. It runs before the slot is taken,
+    so any request body it needs should be read there, never inside the slot.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions['admission']
+            # remote_addr, never the raw X-Forwarded-For header, which any caller can
+            # set; behind a proxy, TRUSTED_PROXY_HOPS makes ProxyFix rewrite it
+            client = request.remote_addr
+            weight = controller.weight_for(size_of(*args, **kwargs))
+
+            try:
+                controller.acquire(client, weight)
+            except AdmissionRejected as e:
+                intrusion_logger.warning(f"Admission rejected ({e.reason}) for {request.path}")
+                response = jsonify({'error': 'Server busy, retry later'})
+                response.status_code = e.status
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(client, weight)
+        return wrapper
+    return decorator
@@ -23,13 +23,16 @@ def calculate_fuzzy_hash(file_data):
         logger.error(f"Error calculating fuzzy hash: {e}")
         return None
 
-def submit_to_cuckoo(file_path):
+def submit_to_cuckoo(file_path, data=None, filename=None):
     """
     Uses the requests library to send a file to the external Cuckoo Sandbox API 
     and returns the Cuckoo task_id.
     
     Args:
         file_path (str): The absolute path to the file to submit.
+        data (bytes): If given, sent instead of the file's contents (under the
+            file's name), e.g. only the ciphertext region of a stored container.
+        filename (str): Name reported to the sandbox; defaults to the file's basename.
         
     Returns:
         int: The Cuckoo task ID or None if submission fails.
@@ -43,10 +46,13 @@ def submit_to_cuckoo(file_path):
     submit_url = f"{sandbox_url}/tasks/create/file"
     
     try:
-        filename = os.path.basename(file_path)
-        with open(file_path, 'rb') as f:
-            files = {'file': (filename, f)}
-            response = requests.post(submit_url, files=files)
+        filename = filename or os.path.basename(file_path)
+        if data is not None:
+            response = requests.post(submit_url, files={'file': (filename, data)})
+        else:
+            with open(file_path, 'rb') as f:
+                files = {'file': (filename, f)}
+                response = requests.post(submit_url, files=files)
             
         response.raise_for_status()
         data = response.json()
@@ -104,3 +110,23 @@ def check_hash_history(fuzzy_hash):
     # Placeholder logic: for now, we assume no match for everything
     # unless we want to simulate a match for testing purposes.
     return 'NO_MATCH'
+
+def check_ioc_blocklist(data_hash):
+    """
+    Checks a file's exact SHA-256 digest against the known-bad IOC table
+    opened at startup (app.extensions['ioc']).
+    
+    Args:
+        data_hash (bytes): The raw 32-byte SHA-256 digest (as returned by hash_data).
+        
+    Returns:
+        str: 'IOC_MATCH' or 'NO_MATCH'.
+    """
+    if not data_hash:
+        return 'NO_MATCH'
+
+    try:
+        return 'IOC_MATCH' if data_hash in current_app.extensions['ioc'] else 'NO_MATCH'
+    except Exception as e:
+        logger.error(f"Error checking IOC blocklist: {e}")
+        return 'NO_MATCH'
@@ -0,0 +1,291 @@
+"""
+Exact-match SHA-256 IOC (indicator of compromise) blocklist.
+
+The table is a single file that is memory-mapped, never parsed:
+
+    [ header (24 bytes) ][ Bloom filter bits ][ sorted 32-byte digests ... ]
+
+    header: magic (4s) | version (B) | hash count k (B) | reserved (H)
+            | digest count (Q) | Bloom filter size in bytes (Q)
+
+Opening a table is an open() + mmap() + header read, so it takes milliseconds
+regardless of size, and only the pages a lookup touches become resident. A
+lookup probes k Bloom bits (O(1), rejects almost every clean file), and only
+on a Bloom hit binary-searches the sorted digests.
+
+Build or refresh a table from hex feeds (one SHA-256 per line):
+    python -m server.security.ioc build feed1.txt [feed2.txt ...] -o storage/ioc/sha256.ioc
+"""
+import argparse
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HSTI'
+VERSION = 1
+DIGEST_SIZE = 32
+
+_HEADER = struct.Struct('>4sBBHQQ')
+
+# A digest viewed as four big-endian words: sorting these sorts the raw bytes
+_DIGEST_DTYPE = np.dtype([('w0', '>u8'), ('w1', '>u8'), ('w2', '>u8'), ('w3', '>u8')])
+_MASK64 = (1 << 64) - 1
+
+# ~10 bits per entry with k=7 gives a ~1% false positive rate
+DEFAULT_BITS_PER_ENTRY = 10
+DEFAULT_HASH_COUNT = 7
+
+
+def _bloom_positions(digest, m_bits, k):
+    # Digests are already uniformly distributed, so slice them instead of
+    # rehashing (Kirsch-Mitzenmacher double hashing). Arithmetic wraps at 64
+    # bits to match the vectorised build in _build_bloom().
+    h1 = int.from_bytes(digest[0:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    return [((h1 + i * h2) & _MASK64) % m_bits for i in range(k)]
+
+
+def _build_bloom(records, m_bits, k):
+    """Returns the Bloom filter bytes for a structured array of digests."""
+    h1 = records['w0'].astype(np.uint64)
+    h2 = records['w1'].astype(np.uint64) | np.uint64(1)
+    bits = np.zeros(m_bits, dtype=bool)
+    for i in range(k):
+        # uint64 arithmetic wraps modulo 2**64, like _bloom_positions()
+        bits[(h1 + np.uint64(i) * h2) % np.uint64(m_bits)] = True
+    # Bit j of byte n is position 8n + j, as read by IOCTable._bloom_contains()
+    return np.packbits(bits, bitorder='little').tobytes()
+
+
+class _DigestView:
+    """Sequence view over the sorted digest region, so bisect can search the mmap."""
+
+    def __init__(self, mm, offset, count):
+        self._mm = mm
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = self._offset + index * DIGEST_SIZE
+        return self._mm[start:start + DIGEST_SIZE]
+
+
+class IOCTable:
+    """A read-only, memory-mapped IOC table. Use IOCTable.empty() when none exists."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            if self.stat.st_size < _HEADER.size:
+                # Also covers empty files, which mmap() refuses
+                raise ValueError(f"Truncated IOC table: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            digest_offset, count, k, bloom_bytes = self._check_header()
+        except BaseException:
+            self._mm.close()
+            raise
+
+        self.count = count
+        self._k = k
+        self._bloom_offset = _HEADER.size
+        self._m_bits = bloom_bytes * 8
+        self._digests = _DigestView(self._mm, digest_offset, count)
+
+    def _check_header(self):
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"Truncated IOC table: {self.path}")
+        magic, version, k, _reserved, count, bloom_bytes = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"Not an IOC table: {self.path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported IOC table version: {version}")
+        digest_offset = _HEADER.size + bloom_bytes
+        if len(self._mm) != digest_offset + count * DIGEST_SIZE:
+            raise ValueError(f"Truncated IOC table: {self.path}")
+        return digest_offset, count, k, bloom_bytes
+
+    @classmethod
+    def empty(cls):
+        table = cls.__new__(cls)
+        table.path = None
+        table.stat = None
+        table.count = 0
+        return table
+
+    def __len__(self):
+        return self.count
+
+    def _bloom_contains(self, digest):
+        mm = self._mm
+        base = self._bloom_offset
+        for pos in _bloom_positions(digest, self._m_bits, self._k):
+            if not mm[base + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __contains__(self, digest):
+        if not self.count or len(digest) != DIGEST_SIZE:
+            return False
+        if not self._bloom_contains(digest):
+            return False
+        index = bisect.bisect_left(self._digests, digest)
+        return index < self.count and self._digests[index] == digest
+
+
+def build_table(digests, out_path, bits_per_entry=DEFAULT_BITS_PER_ENTRY,
+                hash_count=DEFAULT_HASH_COUNT):
+    """
+    Writes an IOC table for the iterable of 32-byte `digests` to `out_path`.
+
+    The table is written to a temp file and renamed over `out_path`, so running
+    IOCStore instances pick up either the old or the new table, never a partial one.
+    Returns the number of unique digests written.
+    """
+    # Digests are packed into one flat buffer and sorted/deduplicated as
+    # fixed-width records, so memory stays at a few times 32 bytes per digest
+    # instead of one Python object each.
+    buffer = bytearray()
+    for digest in digests:
+        if len(digest) != DIGEST_SIZE:
+            raise ValueError(f"Invalid digest length: {len(digest)}")
+        buffer += digest
+    unique = np.unique(np.frombuffer(buffer, dtype=_DIGEST_DTYPE))
+    del buffer
+
+    count = len(unique)
+    bloom_bytes = max(8, (count * bits_per_entry + 7) // 8)
+    m_bits = bloom_bytes * 8
+    bloom = _build_bloom(unique, m_bits, hash_count)
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, hash_count, 0, count, bloom_bytes))
+            f.write(bloom)
+            f.write(unique.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+class IOCStore:
+    """
+    Holds the current IOCTable for `path` and swaps in a new one when the file
+    is replaced. Lookups never block on a refresh: the table reference is swapped
+    in one assignment, and the old mapping is released once no lookup uses it.
+    """
+
+    def __init__(self, path, refresh_interval=60):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._table = IOCTable.empty()
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the table if the file changed. Returns True if a new table was loaded."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                if self._table.count:
+                    logger.warning(f"IOC table {self.path} disappeared; keeping loaded table")
+                return False
+
+            current = self._table.stat
+            if current is not None and (st.st_ino, st.st_size, st.st_mtime_ns) == \
+                    (current.st_ino, current.st_size, current.st_mtime_ns):
+                return False
+
+            try:
+                table = IOCTable(self.path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load IOC table {self.path}: {e}")
+                return False
+            self._table = table
+            logger.info(f"Loaded IOC table {self.path} ({table.count} digests)")
+            return True
+
+    def maybe_refresh(self):
+        if time.monotonic() - self._last_check >= self.refresh_interval:
+            self.refresh()
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, digest):
+        self.maybe_refresh()
+        return digest in self._table
+
+
+def read_feed(path):
+    """Yields digests from a feed file: one hex SHA-256 per line, '#' comments allowed."""
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            # Tolerate CSV feeds whose first column is the hash
+            value = line.split(',', 1)[0].strip().lower()
+            try:
+                digest = bytes.fromhex(value)
+            except ValueError:
+                digest = b''
+            if len(digest) != DIGEST_SIZE:
+                logger.warning(f"{path}:{line_no}: skipping invalid SHA-256 '{value}'")
+                continue
+            yield digest
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Build or query the SHA-256 IOC table.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="build a table from hex feeds")
+    build_parser.add_argument('feeds', nargs='+')
+    build_parser.add_argument('-o', '--output', default='storage/ioc/sha256.ioc')
+    build_parser.add_argument('--bits-per-entry', type=int, default=DEFAULT_BITS_PER_ENTRY)
+
+    check_parser = subparsers.add_parser('check', help="look up hex digests in a table")
+    check_parser.add_argument('digests', nargs='+')
+    check_parser.add_argument('-t', '--table', default='storage/ioc/sha256.ioc')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        def all_digests():
+            for feed in args.feeds:
+                yield from read_feed(feed)
+
+        started = time.monotonic()
+        written = build_table(all_digests(), args.output, bits_per_entry=args.bits_per_entry)
+        print(f"Wrote {written} digests to {args.output} in {time.monotonic() - started:.1f}s")
+    else:
+        table = IOCTable(args.table)
+        for value in args.digests:
+            status = 'MATCH' if bytes.fromhex(value) in table else 'NO_MATCH'
+            print(f"{value} {status}")
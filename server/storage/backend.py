@@ -0,0 +1,148 @@
+import os
+import re
+import secrets
+from flask import current_app
+
+from .container import CONTAINER_EXT, ContainerReader, build_container
+from .migrate import migrate_object
+
+# Object IDs are 128 random bits, hex encoded
+_OBJECT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+TMP_SUFFIX = '.tmp'
+QUARANTINE_DIR = 'quarantine'
+
+
+def _fsync_dir(path):
+    # Persist the rename itself. Directories cannot be opened on Windows.
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileStorageBackend:
+    """
+    Stores containers under `root`, fanned out into hash-sharded directories:
+
+        root/ab/cd/abcd....hstc
+
+    Writes go to a temp file in the target shard, are fsync'd, then renamed into
+    place, so a crash never leaves a half-written object under its final name.
+    Objects written before sharding (flat `root/<name>.hstc`) remain readable,
+    and legacy `root/<name>.json` + `.data` pairs are converted on first access.
+    """
+
+    def __init__(self, root, fanout=2):
+        self.root = root
+        self.fanout = fanout
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def new_object_id():
+        return secrets.token_hex(16)
+
+    def path_for(self, object_id):
+        """
+        Returns the container path for `object_id`, or None if the ID is not valid.
+        """
+        if _OBJECT_ID_RE.match(object_id):
+            shards = [object_id[i * 2:i * 2 + 2] for i in range(self.fanout)]
+            return os.path.join(self.root, *shards, f"{object_id}{CONTAINER_EXT}")
+
+        # Legacy flat object ("<original_filename>.<timestamp>"). Reject anything
+        # that could escape the storage root.
+        if (not object_id or object_id.startswith('.')
+                or os.path.basename(object_id) != object_id
+                or '/' in object_id or '\\' in object_id):
+            return None
+        return os.path.join(self.root, f"{object_id}{CONTAINER_EXT}")
+
+    def exists(self, object_id):
+        path = self.path_for(object_id)
+        return path is not None and os.path.exists(path)
+
+    def _legacy_path(self, object_id, ext):
+        # Legacy pairs only ever lived flat in the root, next to their container
+        path = self.path_for(object_id)
+        if path is None or os.path.dirname(path) != self.root:
+            return None
+        return os.path.join(self.root, f"{object_id}{ext}")
+
+    def size(self, object_id):
+        """Returns the stored size of `object_id` in bytes, or 0 if it does not exist."""
+        for path in (self.path_for(object_id), self._legacy_path(object_id, '.data')):
+            try:
+                if path:
+                    return os.path.getsize(path)
+            except OSError:
+                continue
+        return 0
+
+    def migrate_legacy(self, object_id):
+        """
+        Converts the legacy `.json`/`.data` pair for `object_id` into a container,
+        keeping the originals. Returns True if the object now exists as a container.
+        """
+        envelope_path = self._legacy_path(object_id, '.json')
+        if envelope_path is None or not os.path.exists(envelope_path):
+            return False
+        migrate_object(self.root, object_id)
+        return self.exists(object_id)
+
+    def put(self, envelope, ciphertext, object_id=None):
+        """Atomically stores a new object. Returns its object ID."""
+        object_id = object_id or self.new_object_id()
+        path = self.path_for(object_id)
+        if path is None:
+            raise ValueError(f"Invalid object id: {object_id}")
+
+        shard_dir = os.path.dirname(path)
+        created = self._make_shard_dirs(shard_dir)
+        tmp_path = os.path.join(shard_dir, f".{object_id}.{secrets.token_hex(4)}{TMP_SUFFIX}")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(build_container(envelope, ciphertext))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _fsync_dir(shard_dir)
+        # New shard directories are only durable once their parents are synced too
+        for directory in created:
+            _fsync_dir(os.path.dirname(directory))
+        return object_id
+
+    def _make_shard_dirs(self, shard_dir):
+        """Creates `shard_dir` and its missing parents. Returns the ones it created."""
+        missing = []
+        directory = shard_dir
+        while directory and directory != self.root and not os.path.isdir(directory):
+            missing.append(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        os.makedirs(shard_dir, exist_ok=True)
+        return missing
+
+    def open(self, object_id):
+        """
+        Returns a ContainerReader for `object_id`. Raises FileNotFoundError if the
+        object does not exist or the ID is invalid.
+        """
+        path = self.path_for(object_id)
+        if path is None:
+            raise FileNotFoundError(object_id)
+        return ContainerReader(path)
+
+
+def get_backend():
+    """Returns the storage backend registered on the current app."""
+    return current_app.extensions['storage']
@@ -0,0 +1,208 @@
+import os
+import struct
+import base64
+
+# --- Container Layout ---
+# [ header (20 bytes) ][ binary envelope ][ ciphertext ]
+#
+# header:   magic (4s) | version (B) | flags (B) | reserved (H) | envelope length (I)
+#           | ciphertext length (Q)
+# envelope: fixed field order, each field length-prefixed (H) except the timestamp (Q)
+#
+# The file size must equal header + envelope + ciphertext length exactly, so a
+# truncated object or trailing garbage is detected without reading the ciphertext.
+MAGIC = b'HSTC'
+VERSION = 1
+CONTAINER_EXT = '.hstc'
+
+_HEADER = struct.Struct('>4sBBHIQ')
+_LENGTH = struct.Struct('>H')
+_TIMESTAMP = struct.Struct('>Q')
+
+# Binary (bytes) fields, in on-disk order. Text fields are stored UTF-8 encoded.
+_BINARY_FIELDS = ('encrypted_aes_key', 'nonce', 'tag', 'signature')
+_TEXT_FIELDS = ('original_filename', 'fuzzy_hash')
+
+# One read this size normally covers header + envelope (RSA-2048 key and signature
+# are 256 bytes each), so metadata costs a single pread.
+_METADATA_READ_SIZE = 4096
+
+
+class ContainerError(ValueError):
+    """Raised when a file is not a valid container (bad magic, version or size)."""
+
+
+def _pack_field(value):
+    if len(value) > 0xFFFF:
+        raise ContainerError("Envelope field too large")
+    return _LENGTH.pack(len(value)) + value
+
+
+def pack_envelope(envelope):
+    """
+    Serializes an envelope dict (raw bytes for crypto fields) into the binary form.
+    """
+    parts = [_pack_field(envelope['original_filename'].encode('utf-8'))]
+    for field in _BINARY_FIELDS:
+        parts.append(_pack_field(envelope[field]))
+    parts.append(_TIMESTAMP.pack(int(envelope.get('timestamp') or 0)))
+    parts.append(_pack_field((envelope.get('fuzzy_hash') or '').encode('utf-8')))
+    return b''.join(parts)
+
+
+def unpack_envelope(blob):
+    """
+    Parses a binary envelope back into a dict. Inverse of pack_envelope().
+    """
+    view = memoryview(blob)
+    offset = 0
+
+    def take_field():
+        nonlocal offset
+        if offset + _LENGTH.size > len(view):
+            raise ContainerError("Truncated envelope")
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + length > len(view):
+            raise ContainerError("Truncated envelope")
+        value = bytes(view[offset:offset + length])
+        offset += length
+        return value
+
+    envelope = {'original_filename': take_field().decode('utf-8')}
+    for field in _BINARY_FIELDS:
+        envelope[field] = take_field()
+    if offset + _TIMESTAMP.size > len(view):
+        raise ContainerError("Truncated envelope")
+    (envelope['timestamp'],) = _TIMESTAMP.unpack_from(view, offset)
+    offset += _TIMESTAMP.size
+    envelope['fuzzy_hash'] = take_field().decode('utf-8') or None
+    return envelope
+
+
+def envelope_to_json(envelope):
+    """
+    Converts a binary-form envelope into the JSON-safe (base64) form the API returns.
+    """
+    result = dict(envelope)
+    for field in _BINARY_FIELDS:
+        result[field] = base64.b64encode(envelope[field]).decode('utf-8')
+    return result
+
+
+def envelope_from_json(envelope):
+    """
+    Converts a legacy JSON (base64) envelope into the binary form.
+    """
+    result = dict(envelope)
+    for field in _BINARY_FIELDS:
+        result[field] = base64.b64decode(envelope[field])
+    for field in _TEXT_FIELDS:
+        result.setdefault(field, None)
+    return result
+
+
+def build_container(envelope, ciphertext):
+    """Returns the full container bytes for an envelope and its ciphertext."""
+    packed = pack_envelope(envelope)
+    header = _HEADER.pack(MAGIC, VERSION, 0, 0, len(packed), len(ciphertext))
+    return header + packed + ciphertext
+
+
+def _pread(fd, size, offset):
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    # Windows has no os.pread; fall back to seek + read on the same descriptor.
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+class ContainerReader:
+    """
+    Lazy reader for a container file.
+
+    Opening the reader costs nothing beyond the open() call; the envelope is parsed
+    on first access to `envelope` (normally one pread), and the ciphertext is only
+    read when read_ciphertext() is called.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        self._envelope = None
+        self._data_offset = None
+        self._ciphertext_size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _load_metadata(self):
+        head = _pread(self._fd, _METADATA_READ_SIZE, 0)
+        if len(head) < _HEADER.size:
+            raise ContainerError("Truncated header")
+        magic, version, _flags, _reserved, envelope_len, ciphertext_len = _HEADER.unpack_from(head)
+        if magic != MAGIC:
+            raise ContainerError("Not a container file")
+        if version != VERSION:
+            raise ContainerError(f"Unsupported container version: {version}")
+
+        end = _HEADER.size + envelope_len
+        file_size = os.fstat(self._fd).st_size
+        if file_size != end + ciphertext_len:
+            raise ContainerError(
+                f"Size mismatch: expected {end + ciphertext_len} bytes, found {file_size}"
+            )
+        if len(head) < end:
+            head += _pread(self._fd, end - len(head), len(head))
+            if len(head) < end:
+                raise ContainerError("Truncated envelope")
+
+        self._envelope = unpack_envelope(head[_HEADER.size:end])
+        self._data_offset = end
+        self._ciphertext_size = ciphertext_len
+
+    @property
+    def envelope(self):
+        if self._envelope is None:
+            self._load_metadata()
+        return self._envelope
+
+    @property
+    def data_offset(self):
+        if self._data_offset is None:
+            self._load_metadata()
+        return self._data_offset
+
+    @property
+    def ciphertext_size(self):
+        if self._ciphertext_size is None:
+            self._load_metadata()
+        return self._ciphertext_size
+
+    def read_ciphertext(self):
+        offset = self.data_offset
+        size = self.ciphertext_size
+        chunks = []
+        while size > 0:
+            chunk = _pread(self._fd, size, offset)
+            if not chunk:
+                # File shrank after the metadata was checked
+                raise ContainerError("Truncated ciphertext")
+            chunks.append(chunk)
+            offset += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
+def read_envelope(path):
+    """Convenience helper: reads only the envelope of a container."""
+    with ContainerReader(path) as reader:
+        return reader.envelope
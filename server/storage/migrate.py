@@ -0,0 +1,96 @@
+"""
+Converts legacy `<id>.json` + `<id>.data` object pairs into single-file containers.
+
+Usage:
+    python -m server.storage.migrate [storage_dir] [--delete] [--dry-run]
+"""
+import argparse
+import json
+import os
+import secrets
+
+from .container import (
+    CONTAINER_EXT, ContainerReader, build_container, envelope_from_json
+)
+
+DEFAULT_STORAGE_DIR = 'storage/encrypted_files'
+
+
+def migrate_object(storage_dir, object_id, delete=False):
+    """
+    Migrates one legacy pair. Returns 'migrated', 'exists' or 'orphan'.
+    The container is written to a temp file and renamed into place, then read
+    back before the legacy files are (optionally) removed.
+    """
+    envelope_path = os.path.join(storage_dir, f"{object_id}.json")
+    data_path = os.path.join(storage_dir, f"{object_id}.data")
+    container_path = os.path.join(storage_dir, f"{object_id}{CONTAINER_EXT}")
+
+    if os.path.exists(container_path):
+        return 'exists'
+    if not (os.path.exists(envelope_path) and os.path.exists(data_path)):
+        return 'orphan'
+
+    with open(envelope_path, 'r') as f:
+        envelope = envelope_from_json(json.load(f))
+    with open(data_path, 'rb') as f:
+        ciphertext = f.read()
+
+    # Unique temp name: the CLI, the scrubber and lazy migration on download may
+    # convert the same pair at once, and each rename must find its own temp file
+    tmp_path = os.path.join(storage_dir, f".{object_id}.{secrets.token_hex(4)}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(build_container(envelope, ciphertext))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, container_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Verify the round trip before touching the originals.
+    with ContainerReader(container_path) as reader:
+        if reader.envelope != envelope or reader.read_ciphertext() != ciphertext:
+            raise RuntimeError(f"Verification failed for {container_path}")
+
+    if delete:
+        os.remove(envelope_path)
+        os.remove(data_path)
+    return 'migrated'
+
+
+def migrate_storage(storage_dir, delete=False, dry_run=False):
+    """Migrates every legacy pair in `storage_dir`. Returns a dict of counts."""
+    counts = {'migrated': 0, 'exists': 0, 'orphan': 0, 'failed': 0}
+    object_ids = sorted(
+        name[:-len('.json')] for name in os.listdir(storage_dir) if name.endswith('.json')
+    )
+    for object_id in object_ids:
+        if dry_run:
+            print(f"[dry-run] {object_id}")
+            continue
+        try:
+            result = migrate_object(storage_dir, object_id, delete=delete)
+        except Exception as e:
+            print(f"[-] {object_id}: {e}")
+            counts['failed'] += 1
+            continue
+        counts[result] += 1
+        print(f"[{result}] {object_id}")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('storage_dir', nargs='?', default=DEFAULT_STORAGE_DIR)
+    parser.add_argument('--delete', action='store_true',
+                        help="remove the .json/.data files after a verified migration")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="list the objects that would be migrated")
+    args = parser.parse_args()
+
+    counts = migrate_storage(args.storage_dir, delete=args.delete, dry_run=args.dry_run)
+    print(f"\nMigrated: {counts['migrated']}, already migrated: {counts['exists']}, "
+          f"orphans skipped: {counts['orphan']}, failed: {counts['failed']}")
@@ -0,0 +1,109 @@
+"""
+Finds and repairs orphaned or corrupt objects in the storage tree.
+
+Runs as its own process (never inside the web workers), either once or on an
+interval:
+    python -m server.storage.scrubber [storage_dir] [--interval 900]
+"""
+import argparse
+import logging
+import os
+import shutil
+import time
+
+from .backend import QUARANTINE_DIR, TMP_SUFFIX, FileStorageBackend
+from .container import CONTAINER_EXT, ContainerError, read_envelope
+from .migrate import migrate_object
+
+logger = logging.getLogger(__name__)
+
+# Temp files younger than this may still belong to an in-flight write
+DEFAULT_TMP_GRACE = 3600
+
+
+def _quarantine(backend, path, stats):
+    quarantine_dir = os.path.join(backend.root, QUARANTINE_DIR)
+    os.makedirs(quarantine_dir, exist_ok=True)
+    target = os.path.join(quarantine_dir, f"{int(time.time())}.{os.path.basename(path)}")
+    try:
+        shutil.move(path, target)
+    except FileNotFoundError:
+        return
+    logger.warning(f"Scrubber quarantined {path}")
+    stats['quarantined'] += 1
+
+
+def scrub_storage(backend, tmp_grace=DEFAULT_TMP_GRACE):
+    """
+    Walks the storage root once and repairs what it can:
+
+    - stale temp files left by crashed writes are removed
+    - containers with a bad header or a size mismatch are quarantined
+    - complete legacy .json/.data pairs are converted to containers; the
+      originals are kept (only `python -m server.storage.migrate --delete`
+      removes them)
+    - legacy halves missing both their partner and a container are quarantined
+
+    Returns a dict of counts.
+    """
+    stats = {'checked': 0, 'tmp_removed': 0, 'repaired': 0, 'quarantined': 0}
+    now = time.time()
+
+    for dirpath, dirnames, filenames in os.walk(backend.root):
+        if dirpath == backend.root and QUARANTINE_DIR in dirnames:
+            dirnames.remove(QUARANTINE_DIR)
+
+        names = set(filenames)
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+
+            if name.endswith(TMP_SUFFIX):
+                try:
+                    if now - os.path.getmtime(path) > tmp_grace:
+                        os.remove(path)
+                        stats['tmp_removed'] += 1
+                except FileNotFoundError:
+                    pass
+
+            elif name.endswith(CONTAINER_EXT):
+                stats['checked'] += 1
+                try:
+                    read_envelope(path)
+                except FileNotFoundError:
+                    pass
+                except (ContainerError, UnicodeDecodeError):
+                    _quarantine(backend, path, stats)
+
+            elif name.endswith('.json') or name.endswith('.data'):
+                object_id = name[:-len('.json')]
+                partner = f"{object_id}.data" if name.endswith('.json') else f"{object_id}.json"
+                if partner in names:
+                    if name.endswith('.json'):
+                        try:
+                            if migrate_object(dirpath, object_id) == 'migrated':
+                                stats['repaired'] += 1
+                        except Exception as e:
+                            logger.error(f"Scrubber could not migrate {object_id}: {e}")
+                elif f"{object_id}{CONTAINER_EXT}" not in names:
+                    _quarantine(backend, path, stats)
+
+    return stats
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Scrub the encrypted file store.")
+    parser.add_argument('storage_dir', nargs='?', default='storage/encrypted_files')
+    parser.add_argument('--interval', type=float, default=0,
+                        help="seconds between passes; 0 runs a single pass")
+    parser.add_argument('--tmp-grace', type=float, default=DEFAULT_TMP_GRACE,
+                        help="age in seconds after which temp files count as abandoned")
+    args = parser.parse_args()
+
+    backend = FileStorageBackend(args.storage_dir)
+    while True:
+        stats = scrub_storage(backend, tmp_grace=args.tmp_grace)
+        logger.info(f"Storage scrub complete: {stats}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
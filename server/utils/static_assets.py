@@ -0,0 +1,248 @@
+"""
+In-memory, precompressed serving of the React build (frontend/build).
+
+At startup every file in the build is read once and kept in memory together
+with its gzip and brotli variants, strong ETags and cache headers, so a static
+hit is a dict lookup with no filesystem access. Variants are taken from
+`<file>.gz` / `<file>.br` siblings when they exist and are up to date, otherwise
+they are compressed at load time with a fast brotli level. Source maps (*.map)
+are served uncompressed. To move compression to build time, at maximum brotli
+quality, run:
+
+    python -m server.utils.static_assets frontend/build
+
+Rebuilding the frontend requires a server restart to be picked up.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from email.utils import formatdate
+
+from flask import Response, abort, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are served
+    brotli = None
+
+# Content-hashed bundle names from react-scripts, e.g. main.3f2a1b4c.js,
+# 787.a1b2c3d4.chunk.css, logo.6ce24c58023cc2f8fd88fe9d219db6c6.svg. Only
+# files under static/ are hashed; files copied from public/ (such as
+# data.20240101.json) may look alike but change in place.
+_HASHED_DIR = 'static/'
+_HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8,}\.(?:chunk\.)?[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Files larger than this are not held in memory; they are streamed from disk
+MAX_CACHED_BYTES = 8 * 1024 * 1024
+MIN_COMPRESS_BYTES = 256
+
+_COMPRESSIBLE_TYPES = (
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'application/wasm', 'application/xml', 'image/svg+xml', 'image/x-icon',
+)
+_PRECOMPRESSED_SUFFIXES = {'.gz': 'gzip', '.br': 'br'}
+
+# Source maps are large, only fetched by developer tools, and served identity-only
+_UNCOMPRESSED_SUFFIXES = ('.map',)
+
+# Brotli quality 11 is far too slow to run in every worker at startup; it is
+# only used by the offline precompress_build(). Startup uses a fast level.
+OFFLINE_BROTLI_QUALITY = 11
+STARTUP_BROTLI_QUALITY = 5
+
+
+def _is_compressible(name, mimetype):
+    if name.endswith(_UNCOMPRESSED_SUFFIXES):
+        return False
+    return mimetype.startswith('text/') or mimetype in _COMPRESSIBLE_TYPES
+
+
+def _compress(encoding, data, brotli_quality=STARTUP_BROTLI_QUALITY):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output (and so the ETag) stable across restarts
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=brotli_quality)
+
+
+def _available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class StaticAsset:
+    __slots__ = ('path', 'mimetype', 'cache_control', 'last_modified', 'variants')
+
+    def __init__(self, path, mimetype, cache_control, last_modified):
+        self.path = path
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.last_modified = last_modified
+        # encoding -> (body, etag); body is None for files served from disk
+        self.variants = {}
+
+
+class StaticAssetCache:
+    """Maps URL paths under the build directory to preloaded StaticAssets."""
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        self.load()
+
+    def load(self):
+        assets = {}
+        if os.path.isdir(self.root):
+            for dirpath, _dirnames, filenames in os.walk(self.root):
+                for name in filenames:
+                    if os.path.splitext(name)[1] in _PRECOMPRESSED_SUFFIXES:
+                        continue
+                    path = os.path.join(dirpath, name)
+                    rel_path = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    assets[rel_path] = self._load_asset(path, rel_path)
+        self.assets = assets
+
+    def _load_asset(self, path, rel_path):
+        name = os.path.basename(path)
+        st = os.stat(path)
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        hashed = rel_path.startswith(_HASHED_DIR) and _HASHED_NAME_RE.search(name)
+        cache_control = IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL
+        asset = StaticAsset(path, mimetype, cache_control, formatdate(st.st_mtime, usegmt=True))
+
+        if st.st_size > MAX_CACHED_BYTES:
+            etag = f'"{st.st_size:x}-{int(st.st_mtime):x}"'
+            asset.variants['identity'] = (None, etag)
+            return asset
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        asset.variants['identity'] = (data, f'"{digest}"')
+
+        if len(data) < MIN_COMPRESS_BYTES or not _is_compressible(name, mimetype.split(';')[0]):
+            return asset
+
+        for encoding in _available_encodings():
+            suffix = '.br' if encoding == 'br' else '.gz'
+            sibling = path + suffix
+            if os.path.exists(sibling) and os.path.getmtime(sibling) >= st.st_mtime:
+                with open(sibling, 'rb') as f:
+                    body = f.read()
+            else:
+                body = _compress(encoding, data)
+            # Only worth serving if it actually saves bytes. The ETag hashes the
+            # compressed bytes, which differ between startup and offline levels.
+            if len(body) < len(data) * 0.9:
+                body_digest = hashlib.sha256(body).hexdigest()[:20]
+                asset.variants[encoding] = (body, f'"{body_digest}-{encoding}"')
+        return asset
+
+    def get(self, rel_path):
+        return self.assets.get(rel_path)
+
+
+def _accepted_encodings(header):
+    """Parses Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def _choose_encoding(asset, header):
+    if len(asset.variants) == 1 or not header:
+        return 'identity'
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = 'identity', 0.0
+    # Preference order breaks ties: br before gzip
+    for encoding in ('br', 'gzip'):
+        q = accepted.get(encoding, wildcard)
+        if encoding in asset.variants and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def serve_static_asset(rel_path):
+    """Builds the response for a build file, honouring Accept-Encoding and If-None-Match."""
+    asset = current_app.extensions['static_assets'].get(rel_path)
+    if asset is None:
+        abort(404)
+
+    encoding = _choose_encoding(asset, request.headers.get('Accept-Encoding', ''))
+    body, etag = asset.variants[encoding]
+
+    headers = {
+        'ETag': etag,
+        'Cache-Control': asset.cache_control,
+        'Last-Modified': asset.last_modified,
+    }
+    if len(asset.variants) > 1:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=304, headers=headers)
+
+    if body is None:
+        # Oversized file: stream from disk in chunks, but keep our cache headers
+        def stream(path=asset.path):
+            with open(path, 'rb') as f:
+                while chunk := f.read(64 * 1024):
+                    yield chunk
+        body = stream()
+    return Response(body, content_type=asset.mimetype, headers=headers)
+
+
+def precompress_build(root):
+    """Writes .gz (and .br if available) siblings for compressible files in `root`."""
+    written = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1] in _PRECOMPRESSED_SUFFIXES:
+                continue
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            path = os.path.join(dirpath, name)
+            if not _is_compressible(name, mimetype) or os.path.getsize(path) < MIN_COMPRESS_BYTES:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in _available_encodings():
+                suffix = '.br' if encoding == 'br' else '.gz'
+                with open(path + suffix, 'wb') as f:
+                    f.write(_compress(encoding, data, brotli_quality=OFFLINE_BROTLI_QUALITY))
+                written += 1
+    return written
+
+
+if __name__ == '__main__':
+    build_dir = sys.argv[1] if len(sys.argv) > 1 else 'frontend/build'
+    if brotli is None:
+        print("brotli not installed; writing gzip variants only")
+    print(f"Wrote {precompress_build(build_dir)} precompressed files under {build_dir}")
@@ -0,0 +1,217 @@
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from flask import Flask, request
+
+from server.routes.upload import received_upload_size
+from server.security.admission import (
+    AdmissionController, AdmissionRejected, admission_controlled
+)
+
+
+def make_controller(**overrides):
+    settings = dict(capacity=4, unit_bytes=100, max_queue=4, queue_timeout=2,
+                    per_client_limit=10, retry_after=1)
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def acquire_in_thread(controller, client, weight, results):
+    def run():
+        try:
+            controller.acquire(client, weight)
+            results.append((client, 'granted', time.monotonic()))
+        except AdmissionRejected as e:
+            results.append((client, e.reason, time.monotonic()))
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_for_queue(controller, depth, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while controller.metrics()['queue_depth'] != depth:
+        assert time.monotonic() < deadline, "queue never reached expected depth"
+        time.sleep(0.005)
+
+
+def test_weight_is_capped_at_capacity():
+    controller = make_controller()
+    assert controller.weight_for(0) == 1
+    assert controller.weight_for(None) == 1
+    assert controller.weight_for(250) == 3
+    assert controller.weight_for(10 ** 9) == 4
+
+
+def test_admits_up_to_capacity_then_queues():
+    controller = make_controller(queue_timeout=0.05)
+    controller.acquire('a', 2)
+    controller.acquire('b', 2)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('c', 1)
+    assert excinfo.value.status == 503
+    assert excinfo.value.reason == 'timeout'
+    controller.release('a', 2)
+    controller.acquire('c', 1)
+    assert controller.metrics()['in_use'] == 3
+
+
+def test_small_request_runs_ahead_of_large_head():
+    controller = make_controller(reserve_after=1.0)
+    controller.acquire('busy', 3)
+    results = []
+    big = acquire_in_thread(controller, 'big', 4, results)
+    wait_for_queue(controller, 1)
+
+    started = time.monotonic()
+    controller.acquire('small', 1)
+    assert time.monotonic() - started < 0.5
+
+    controller.release('small', 1)
+    controller.release('busy', 3)
+    big.join()
+    assert results[0][:2] == ('big', 'granted')
+
+
+def test_aged_head_reserves_freed_units():
+    controller = make_controller(reserve_after=0)
+    controller.acquire('busy', 3)
+    results = []
+    big = acquire_in_thread(controller, 'big', 4, results)
+    wait_for_queue(controller, 1)
+    small = acquire_in_thread(controller, 'small', 1, results)
+    wait_for_queue(controller, 2)
+
+    controller.release('busy', 3)
+    big.join()
+    assert [r[0] for r in results] == ['big']
+
+    controller.release('big', 4)
+    small.join()
+    assert [r[0] for r in results] == ['big', 'small']
+
+
+def test_timeout_is_recorded_in_wait_metrics():
+    controller = make_controller(capacity=1, queue_timeout=0.1)
+    controller.acquire('a', 1)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('b', 1)
+
+    metrics = controller.metrics()
+    assert metrics['rejected_total']['timeout'] == 1
+    assert metrics['wait_seconds']['count'] == 1
+    assert metrics['wait_seconds']['max'] >= 0.1
+    assert metrics['timeout_wait_seconds']['count'] == 1
+    assert metrics['queue_depth'] == 0
+
+
+def test_full_queue_rejects_immediately():
+    controller = make_controller(capacity=1, max_queue=1, queue_timeout=1)
+    controller.acquire('a', 1)
+    results = []
+    waiter = acquire_in_thread(controller, 'b', 1, results)
+    wait_for_queue(controller, 1)
+
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('c', 1)
+    assert excinfo.value.reason == 'queue_full'
+    assert time.monotonic() - started < 0.5
+
+    controller.release('a', 1)
+    waiter.join()
+    assert results[0][:2] == ('b', 'granted')
+
+
+def test_per_client_quota():
+    controller = make_controller(per_client_limit=2)
+    controller.acquire('a', 1)
+    controller.acquire('a', 1)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('a', 1)
+    assert excinfo.value.status == 429
+    controller.acquire('b', 1)
+
+    controller.release('a', 1)
+    controller.acquire('a', 1)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.extensions['admission'] = make_controller(capacity=1, queue_timeout=0.05,
+                                                  per_client_limit=1)
+    hold = threading.Event()
+
+    @app.route('/work')
+    @admission_controlled(lambda: 0)
+    def work():
+        hold.wait(1)
+        return 'done'
+
+    app.hold = hold
+    return app
+
+
+def test_decorator_returns_503_with_retry_after(app):
+    client = app.test_client()
+    app.hold.set()
+    assert client.get('/work').status_code == 200
+
+    app.extensions['admission'].acquire('someone-else', 1)
+    response = client.get('/work')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_quota_ignores_spoofed_forwarded_for(app):
+    results = []
+
+    def first_request():
+        results.append(app.test_client().get('/work').status_code)
+
+    thread = threading.Thread(target=first_request)
+    thread.start()
+    wait_deadline = time.monotonic() + 1
+    while app.extensions['admission'].metrics()['running'] != 1:
+        assert time.monotonic() < wait_deadline
+        time.sleep(0.005)
+
+    response = app.test_client().get('/work', headers={'X-Forwarded-For': '203.0.113.7'})
+    assert response.status_code == 429
+
+    app.hold.set()
+    thread.join()
+    assert results == [200]
+
+
+@pytest.fixture
+def upload_app():
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 1000
+    app.extensions['admission'] = make_controller(capacity=8)
+
+    @app.route('/upload', methods=['POST'])
+    @admission_controlled(received_upload_size)
+    def upload():
+        # The body was received before the slot; the file still reads from the start
+        return {'in_use': app.extensions['admission'].metrics()['in_use'],
+                'data': request.files['file'].read().decode('utf-8')}
+
+    return app
+
+
+def test_upload_is_weighed_on_received_size(upload_app):
+    response = upload_app.test_client().post(
+        '/upload', data={'file': (BytesIO(b'x' * 250), 'a.bin')})
+    assert response.status_code == 200
+    assert response.json == {'in_use': 3, 'data': 'x' * 250}
+
+
+def test_upload_over_max_content_length_is_rejected(upload_app):
+    response = upload_app.test_client().post(
+        '/upload', data={'file': (BytesIO(b'x' * 2000), 'a.bin')})
+    assert response.status_code == 413
+    assert upload_app.extensions['admission'].metrics()['admitted_total'] == 0
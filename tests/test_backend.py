@@ -0,0 +1,108 @@
+import json
+import os
+
+import pytest
+
+from server.storage.backend import FileStorageBackend
+from server.storage.container import envelope_to_json
+from server.storage.migrate import migrate_object
+
+ENVELOPE = {
+    'original_filename': 'notes.txt',
+    'encrypted_aes_key': b'k' * 256,
+    'nonce': b'n' * 12,
+    'tag': b't' * 16,
+    'signature': b's' * 256,
+    'timestamp': 1761068440,
+    'fuzzy_hash': None,
+}
+CIPHERTEXT = os.urandom(4096)
+LEGACY_ID = 'notes.txt.1761068440'
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return FileStorageBackend(str(tmp_path / 'store'))
+
+
+def write_legacy_pair(root, object_id, envelope=ENVELOPE, ciphertext=CIPHERTEXT):
+    with open(os.path.join(root, f"{object_id}.json"), 'w') as f:
+        json.dump(envelope_to_json(envelope), f)
+    with open(os.path.join(root, f"{object_id}.data"), 'wb') as f:
+        f.write(ciphertext)
+
+
+def test_legacy_pair_is_migrated_on_first_access(backend):
+    write_legacy_pair(backend.root, LEGACY_ID)
+    assert not backend.exists(LEGACY_ID)
+    assert backend.size(LEGACY_ID) == len(CIPHERTEXT)
+
+    assert backend.migrate_legacy(LEGACY_ID)
+    with backend.open(LEGACY_ID) as reader:
+        assert reader.envelope == ENVELOPE
+        assert reader.read_ciphertext() == CIPHERTEXT
+    # The originals are kept until an explicit `migrate --delete`
+    assert os.path.exists(os.path.join(backend.root, f"{LEGACY_ID}.json"))
+
+
+def test_migrate_legacy_without_pair(backend):
+    assert not backend.migrate_legacy(LEGACY_ID)
+    assert not backend.migrate_legacy('../escape')
+
+
+def test_migrate_leaves_no_temp_files(backend):
+    write_legacy_pair(backend.root, LEGACY_ID)
+    assert migrate_object(backend.root, LEGACY_ID) == 'migrated'
+    assert not [name for name in os.listdir(backend.root) if name.endswith('.tmp')]
+
+
+def test_path_for_shards_object_ids(backend):
+    object_id = 'ab' + 'cd' + '0' * 28
+    assert backend.path_for(object_id) == os.path.join(backend.root, 'ab', 'cd', f"{object_id}.hstc")
+    assert backend.path_for(LEGACY_ID) == os.path.join(backend.root, f"{LEGACY_ID}.hstc")
+
+
+@pytest.mark.parametrize('object_id', ['', '..', '../etc/passwd', 'a/b', 'a\\b', '.hidden'])
+def test_path_for_rejects_unsafe_ids(backend, object_id):
+    assert backend.path_for(object_id) is None
+    assert not backend.exists(object_id)
+    assert backend.size(object_id) == 0
+    with pytest.raises(FileNotFoundError):
+        backend.open(object_id)
+    if object_id:
+        with pytest.raises(ValueError):
+            backend.put(ENVELOPE, CIPHERTEXT, object_id=object_id)
+
+
+def test_put_round_trip(backend):
+    object_id = backend.put(ENVELOPE, CIPHERTEXT)
+    assert backend.exists(object_id)
+    with backend.open(object_id) as reader:
+        assert reader.envelope == ENVELOPE
+        assert reader.read_ciphertext() == CIPHERTEXT
+
+
+def test_failed_put_leaves_no_temp_file(backend, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, 'replace', fail)
+
+    object_id = backend.new_object_id()
+    with pytest.raises(OSError):
+        backend.put(ENVELOPE, CIPHERTEXT, object_id=object_id)
+    shard_dir = os.path.dirname(backend.path_for(object_id))
+    assert os.listdir(shard_dir) == []
+
+
+def test_put_syncs_new_shard_directories(backend, monkeypatch):
+    synced = []
+    monkeypatch.setattr('server.storage.backend._fsync_dir', synced.append)
+
+    object_id = 'abcd' + '0' * 28
+    backend.put(ENVELOPE, CIPHERTEXT, object_id=object_id)
+    ab = os.path.join(backend.root, 'ab')
+    assert set(synced) == {os.path.join(ab, 'cd'), ab, backend.root}
+
+    synced.clear()
+    backend.put(ENVELOPE, CIPHERTEXT, object_id='abcd' + '1' * 28)
+    assert synced == [os.path.join(ab, 'cd')]
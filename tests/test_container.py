@@ -0,0 +1,80 @@
+import base64
+
+import pytest
+
+from server.storage.container import (
+    ContainerError, ContainerReader, build_container, envelope_from_json,
+    envelope_to_json, pack_envelope, read_envelope, unpack_envelope
+)
+
+ENVELOPE = {
+    'original_filename': 'report (final).pdf',
+    'encrypted_aes_key': b'k' * 256,
+    'nonce': b'n' * 12,
+    'tag': b't' * 16,
+    'signature': b's' * 256,
+    'timestamp': 1761068440,
+    'fuzzy_hash': '3:abc:def',
+}
+CIPHERTEXT = bytes(range(256)) * 40
+
+
+def write(tmp_path, data, name='object.hstc'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_envelope_round_trip():
+    assert unpack_envelope(pack_envelope(ENVELOPE)) == ENVELOPE
+
+
+def test_envelope_without_fuzzy_hash():
+    envelope = dict(ENVELOPE, fuzzy_hash=None)
+    assert unpack_envelope(pack_envelope(envelope))['fuzzy_hash'] is None
+
+
+def test_json_round_trip():
+    as_json = envelope_to_json(ENVELOPE)
+    assert as_json['nonce'] == base64.b64encode(ENVELOPE['nonce']).decode('utf-8')
+    assert envelope_from_json(as_json) == ENVELOPE
+
+
+def test_container_round_trip(tmp_path):
+    path = write(tmp_path, build_container(ENVELOPE, CIPHERTEXT))
+    with ContainerReader(path) as reader:
+        assert reader.envelope == ENVELOPE
+        assert reader.ciphertext_size == len(CIPHERTEXT)
+        assert reader.read_ciphertext() == CIPHERTEXT
+
+
+def test_empty_ciphertext(tmp_path):
+    path = write(tmp_path, build_container(ENVELOPE, b''))
+    with ContainerReader(path) as reader:
+        assert reader.read_ciphertext() == b''
+
+
+@pytest.mark.parametrize('keep', [0, 10, 30, 200])
+def test_truncated_header_or_envelope(tmp_path, keep):
+    path = write(tmp_path, build_container(ENVELOPE, CIPHERTEXT)[:keep])
+    with pytest.raises(ContainerError):
+        read_envelope(path)
+
+
+def test_truncated_ciphertext(tmp_path):
+    path = write(tmp_path, build_container(ENVELOPE, CIPHERTEXT)[:-1])
+    with pytest.raises(ContainerError):
+        read_envelope(path)
+
+
+def test_trailing_garbage(tmp_path):
+    path = write(tmp_path, build_container(ENVELOPE, CIPHERTEXT) + b'junk')
+    with pytest.raises(ContainerError):
+        read_envelope(path)
+
+
+def test_bad_magic(tmp_path):
+    path = write(tmp_path, b'XXXX' + build_container(ENVELOPE, CIPHERTEXT)[4:])
+    with pytest.raises(ContainerError):
+        read_envelope(path)
+
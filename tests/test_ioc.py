@@ -0,0 +1,123 @@
+import hashlib
+import os
+
+import pytest
+
+from server.security.ioc import IOCStore, IOCTable, build_table, read_feed
+
+
+def digest(value):
+    return hashlib.sha256(str(value).encode('utf-8')).digest()
+
+
+BAD = [digest(i) for i in range(5000)]
+CLEAN = [digest(f"clean-{i}") for i in range(5000)]
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    path = str(tmp_path / 'sha256.ioc')
+    build_table(BAD, path)
+    return path
+
+
+def test_hits_and_misses(table_path):
+    table = IOCTable(table_path)
+    assert len(table) == len(BAD)
+    assert all(d in table for d in BAD)
+    assert not any(d in table for d in CLEAN)
+
+
+def test_extreme_digests(tmp_path):
+    path = str(tmp_path / 'edge.ioc')
+    edges = [b'\x00' * 32, b'\xff' * 32, b'\xff' * 31 + b'\x00']
+    build_table(edges, path)
+    table = IOCTable(path)
+    assert all(d in table for d in edges)
+    assert b'\x00' * 31 + b'\x01' not in table
+
+
+def test_duplicates_are_removed(tmp_path):
+    path = str(tmp_path / 'dup.ioc')
+    assert build_table(BAD[:10] + BAD[:10], path) == 10
+    assert len(IOCTable(path)) == 10
+
+
+def test_empty_table(tmp_path):
+    path = str(tmp_path / 'empty.ioc')
+    assert build_table([], path) == 0
+    table = IOCTable(path)
+    assert len(table) == 0
+    assert BAD[0] not in table
+
+
+def test_wrong_length_digest(table_path):
+    assert BAD[0][:16] not in IOCTable(table_path)
+    with pytest.raises(ValueError):
+        build_table([b'short'], table_path + '.bad')
+
+
+def test_truncated_table_is_rejected(table_path):
+    with open(table_path, 'r+b') as f:
+        f.truncate(os.path.getsize(table_path) - 1)
+    with pytest.raises(ValueError):
+        IOCTable(table_path)
+
+
+@pytest.mark.parametrize('keep', [0, 5, 23])
+def test_table_truncated_inside_header_is_rejected(table_path, keep):
+    with open(table_path, 'r+b') as f:
+        f.truncate(keep)
+    with pytest.raises(ValueError):
+        IOCTable(table_path)
+
+
+def test_store_survives_truncated_table(table_path):
+    with open(table_path, 'r+b') as f:
+        f.truncate(5)
+    store = IOCStore(table_path)
+    assert len(store) == 0
+    assert BAD[0] not in store
+
+
+def test_missing_table_is_empty_store(tmp_path):
+    store = IOCStore(str(tmp_path / 'missing.ioc'))
+    assert len(store) == 0
+    assert BAD[0] not in store
+
+
+def test_store_swaps_in_rebuilt_table(table_path):
+    store = IOCStore(table_path, refresh_interval=0)
+    old_table = store._table
+    assert BAD[0] in store
+
+    new_bad = [digest(f"new-{i}") for i in range(100)]
+    build_table(new_bad, table_path)
+
+    assert new_bad[0] in store
+    assert BAD[0] not in store
+    # Lookups still holding the old mapping keep working after the swap
+    assert BAD[0] in old_table
+
+
+def test_store_keeps_table_when_file_disappears(table_path):
+    store = IOCStore(table_path, refresh_interval=0)
+    os.remove(table_path)
+    assert BAD[0] in store
+
+
+def test_build_leaves_no_temp_files(tmp_path):
+    build_table(BAD, str(tmp_path / 'sha256.ioc'))
+    assert os.listdir(tmp_path) == ['sha256.ioc']
+
+
+def test_read_feed(tmp_path):
+    feed = tmp_path / 'feed.txt'
+    feed.write_text(
+        "# header comment\n"
+        f"{BAD[0].hex()}\n"
+        f"{BAD[1].hex().upper()},trojan\n"
+        "not-a-hash\n"
+        "\n"
+    )
+    assert list(read_feed(str(feed))) == [BAD[0], BAD[1]]
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from replay_traffic import (  # noqa: E402
+    Stats, client_ip, endpoint_of, log_files, parse_access_logs, throttled_share
+)
+
+
+def write_log(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines))
+    return str(path)
+
+
+@pytest.mark.parametrize('logged, expected', [
+    ('1.2.3.4', '1.2.3.4'),
+    ('1.2.3.4, 10.0.0.9', '1.2.3.4'),
+    ('2001:db8::1, 10.0.0.9, 10.0.0.10', '2001:db8::1'),
+    ('None', None),
+    ('', None),
+])
+def test_client_ip(logged, expected):
+    assert client_ip(logged) == expected
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/api/file/download/abc123', '/api/file/download/<id>'),
+    ('/api/ids/report/42', '/api/ids/report/<task_id>'),
+    ('/static/js/main.3f2a1b4c.js', '/static/*'),
+    ('/api/upload', '/api/upload'),
+])
+def test_endpoint_of(path, expected):
+    assert endpoint_of(path) == expected
+
+
+def test_parse_access_logs(tmp_path):
+    path = write_log(tmp_path / 'access.log', [
+        '2026-10-19 10:00:00,200 - INFO - 1.2.3.4, 10.0.0.9 - GET /api/file/download/abc',
+        '2026-10-19 10:00:00,100 - INFO - None - POST /api/upload',
+        '2026-10-19 10:00:00,300 - WARNING - 5.6.7.8 - 404 Not Found: /favicon.ico',
+        '2026-10-19 10:00:00,400 - INFO - ::1 - GET /static/app.js',
+        'garbage line',
+        '',
+    ])
+    entries, skipped = parse_access_logs([path])
+    assert [entry[1:] for entry in entries] == [
+        (None, 'POST', '/api/upload'),
+        ('1.2.3.4', 'GET', '/api/file/download/abc'),
+        ('::1', 'GET', '/static/app.js'),
+    ]
+    assert entries[1][0] - entries[0][0] == pytest.approx(0.1, abs=1e-3)
+    # The 404 warning is the app's own message, not an unparsed request
+    assert skipped == 1
+
+
+def test_log_files_oldest_first(tmp_path):
+    for name in ('access.log', 'access.log.1', 'access.log.2', 'access.log.10', 'access.log.bak'):
+        (tmp_path / name).write_text('')
+    names = [os.path.basename(path) for path in log_files(str(tmp_path))]
+    assert names == ['access.log.10', 'access.log.2', 'access.log.1', 'access.log']
+
+
+def test_log_files_missing_dir(tmp_path):
+    assert log_files(str(tmp_path / 'missing')) == []
+
+
+def test_stats_summary():
+    stats = Stats()
+    for latency in range(1, 101):
+        stats.record('/api/upload', 201, latency / 1000, start_lag=0.0)
+    stats.record('/api/upload', 500, 0.2, start_lag=0.05)
+    stats.record('/api/upload', 429, 0.001, start_lag=0.0)
+    stats.record('/api/upload', 'exception', 0.3, start_lag=0.0)
+
+    row = stats.summary(elapsed=2.0)['/api/upload']
+    assert row['requests'] == 103
+    assert row['rps'] == pytest.approx(51.5)
+    assert row['p50_ms'] == pytest.approx(51)
+    assert row['max_ms'] == pytest.approx(300)
+    assert row['max_start_lag_ms'] == pytest.approx(50)
+    assert row['error_rate'] == pytest.approx(2 / 103)
+    assert row['throttled_rate'] == pytest.approx(1 / 103)
+    assert row['statuses'] == {'201': 100, '500': 1, '429': 1, 'exception': 1}
+    assert stats.max_lag == pytest.approx(0.05)
+
+
+def test_throttled_share():
+    stats = Stats()
+    stats.record('/a', 429, 0.01, start_lag=0.0)
+    stats.record('/a', 200, 0.01, start_lag=0.0)
+    stats.record('/b', 429, 0.01, start_lag=0.0)
+    stats.record('/b', 429, 0.01, start_lag=0.0)
+    assert throttled_share(stats.summary(1.0)) == pytest.approx(0.75)
+    assert throttled_share({}) == 0.0
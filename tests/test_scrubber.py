@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from server.storage.backend import QUARANTINE_DIR, FileStorageBackend
+from server.storage.scrubber import scrub_storage
+from test_backend import CIPHERTEXT, ENVELOPE, LEGACY_ID, write_legacy_pair
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return FileStorageBackend(str(tmp_path / 'store'))
+
+
+def quarantined(backend):
+    quarantine_dir = os.path.join(backend.root, QUARANTINE_DIR)
+    return sorted(os.listdir(quarantine_dir)) if os.path.isdir(quarantine_dir) else []
+
+
+def test_clean_store_is_untouched(backend):
+    object_id = backend.put(ENVELOPE, CIPHERTEXT)
+    stats = scrub_storage(backend)
+    assert stats == {'checked': 1, 'tmp_removed': 0, 'repaired': 0, 'quarantined': 0}
+    assert backend.exists(object_id)
+
+
+def test_only_stale_temp_files_are_removed(backend):
+    stale = os.path.join(backend.root, '.stale.tmp')
+    fresh = os.path.join(backend.root, '.fresh.tmp')
+    for path in (stale, fresh):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    stats = scrub_storage(backend, tmp_grace=3600)
+    assert stats['tmp_removed'] == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_corrupt_container_is_quarantined(backend):
+    object_id = backend.put(ENVELOPE, CIPHERTEXT)
+    path = backend.path_for(object_id)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    stats = scrub_storage(backend)
+    assert stats['quarantined'] == 1
+    assert not os.path.exists(path)
+    assert len(quarantined(backend)) == 1
+
+
+def test_legacy_pair_is_converted_and_kept(backend):
+    write_legacy_pair(backend.root, LEGACY_ID)
+    stats = scrub_storage(backend)
+    assert stats['repaired'] == 1
+    assert backend.exists(LEGACY_ID)
+    assert os.path.exists(os.path.join(backend.root, f"{LEGACY_ID}.json"))
+    assert os.path.exists(os.path.join(backend.root, f"{LEGACY_ID}.data"))
+    assert quarantined(backend) == []
+
+
+def test_unpaired_legacy_half_is_quarantined(backend):
+    with open(os.path.join(backend.root, 'lonely.1.data'), 'wb') as f:
+        f.write(CIPHERTEXT)
+    stats = scrub_storage(backend)
+    assert stats['quarantined'] == 1
+    assert quarantined(backend)[0].endswith('lonely.1.data')
+
+
+def test_half_next_to_its_container_is_kept(backend):
+    write_legacy_pair(backend.root, LEGACY_ID)
+    backend.migrate_legacy(LEGACY_ID)
+    os.remove(os.path.join(backend.root, f"{LEGACY_ID}.json"))
+
+    stats = scrub_storage(backend)
+    assert stats['quarantined'] == 0
+    assert os.path.exists(os.path.join(backend.root, f"{LEGACY_ID}.data"))
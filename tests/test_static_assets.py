@@ -0,0 +1,59 @@
+import pytest
+from flask import Flask
+
+from server.utils.static_assets import (
+    IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssetCache, serve_static_asset
+)
+
+BUNDLE = 'static/js/main.3f2a1b4c.js'
+SOURCE_MAP = 'static/js/main.3f2a1b4c.js.map'
+PUBLIC_DATA = 'data.20240101.json'
+
+
+@pytest.fixture
+def client(tmp_path):
+    build = tmp_path / 'build'
+    (build / 'static' / 'js').mkdir(parents=True)
+    (build / 'index.html').write_text('<html>' + 'x' * 1000 + '</html>')
+    (build / BUNDLE).write_text('console.log(1);' * 500)
+    (build / SOURCE_MAP).write_text('{"mappings": "' + 'AAAA;' * 2000 + '"}')
+    (build / PUBLIC_DATA).write_text('{"rows": []}')
+
+    app = Flask(__name__, static_folder=None)
+    app.extensions['static_assets'] = StaticAssetCache(str(build))
+    app.add_url_rule('/<path:rel_path>', 'asset', serve_static_asset)
+    return app.test_client()
+
+
+def test_hashed_bundle_is_immutable_and_compressed(client):
+    response = client.get(f'/{BUNDLE}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_index_is_revalidated_with_etag(client):
+    response = client.get('/index.html')
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+    assert 'Content-Encoding' not in response.headers
+
+    etag = response.headers['ETag']
+    revalidated = client.get('/index.html', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+
+
+def test_hash_like_name_outside_static_is_revalidated(client):
+    response = client.get(f'/{PUBLIC_DATA}')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+
+
+def test_source_maps_are_served_uncompressed(client):
+    response = client.get(f'/{SOURCE_MAP}', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_unknown_asset_is_404(client):
+    assert client.get('/missing.js').status_code == 404
@@ -0,0 +1,127 @@
+"""
+Local stand-in for the Cuckoo Sandbox REST API, for load tests and development.
+
+Implements the two endpoints server/security/ids.py calls:
+    POST /tasks/create/file   -> {"task_id": N}
+    GET  /tasks/report/<id>   -> a small synthetic report
+
+Usage:
+    python tools/fake_cuckoo.py [--port 8090] [--latency 0.2] [--jitter 0.05] [--failure-rate 0.01]
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_REPORT_PATH_RE = re.compile(r'^/tasks/report/(\d+)$')
+
+
+class FakeCuckooState:
+    """Latency/failure settings and submitted tasks, shared by all handler threads."""
+
+    def __init__(self, latency=0.2, jitter=0.05, failure_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._task_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.tasks = {}
+
+    def delay(self):
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def should_fail(self):
+        return random.random() < self.failure_rate
+
+    def create_task(self, size):
+        with self._lock:
+            task_id = next(self._task_ids)
+            self.tasks[task_id] = {'size': size, 'submitted': time.time()}
+        return task_id
+
+
+class FakeCuckooHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeCuckoo/1.0'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.server.state
+        # Drain the multipart body so the client is never blocked on a full socket
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+
+        if self.path != '/tasks/create/file':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        state.delay()
+        if state.should_fail():
+            self._send_json(500, {'error': 'Simulated sandbox failure'})
+            return
+        task_id = state.create_task(length)
+        self._send_json(200, {'task_id': task_id})
+
+    def do_GET(self):
+        state = self.server.state
+        match = _REPORT_PATH_RE.match(self.path)
+        if not match:
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        state.delay()
+        if state.should_fail():
+            self._send_json(500, {'error': 'Simulated sandbox failure'})
+            return
+        task_id = int(match.group(1))
+        task = state.tasks.get(task_id)
+        if task is None:
+            self._send_json(404, {'error': 'Task not found'})
+            return
+        self._send_json(200, {
+            'info': {'id': task_id, 'score': round(random.uniform(0, 2), 1), 'package': 'generic'},
+            'target': {'category': 'file', 'file': {'size': task['size']}},
+            'signatures': [],
+        })
+
+    def log_message(self, format, *args):
+        # Keep load-test output readable; the replay tool reports its own stats
+        pass
+
+
+def start_fake_cuckoo(host='127.0.0.1', port=8090, latency=0.2, jitter=0.05, failure_rate=0.0):
+    """Starts the fake sandbox on a daemon thread and returns the server."""
+    server = ThreadingHTTPServer((host, port), FakeCuckooHandler)
+    server.daemon_threads = True
+    server.state = FakeCuckooState(latency, jitter, failure_rate)
+    threading.Thread(target=server.serve_forever, name='fake-cuckoo', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Cuckoo Sandbox API for local testing.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.2, help="mean response delay (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.05, help="std deviation of the delay (seconds)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = start_fake_cuckoo(args.host, args.port, args.latency, args.jitter, args.failure_rate)
+    print(f"Fake Cuckoo listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency}s ±{args.jitter}s, failure rate {args.failure_rate:.1%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
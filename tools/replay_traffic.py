@@ -0,0 +1,369 @@
+"""
+Replays the request mix and arrival rate recorded in access.log against a
+running server, and reports throughput, latency percentiles and error rates
+per endpoint.
+
+Reads storage/logs/ids/access.log and its rotated files (access.log.1, .2, ...),
+keeps the recorded inter-arrival times (divided by --speedup), and sends each
+request with X-Forwarded-For set to the original client IP (the first hop of a
+logged proxy chain). The server only honours that header when started with
+TRUSTED_PROXY_HOPS=1 (or more); otherwise every replayed request counts against
+the replay host's address, per-client quotas turn most of the load into 429s,
+and the report warns about it. Latency is measured from the
+time each request was scheduled, not from when a worker got round to sending it,
+so a saturated server or worker pool shows up in the percentiles instead of
+being hidden by the queueing in front of it. Upload bodies are synthesized with sizes
+sampled from the objects already in storage (or a log-normal fallback), and
+downloads are pointed at objects created by the replayed uploads.
+
+Usage:
+    TRUSTED_PROXY_HOPS=1 python -m server.app   # in another shell
+    python tools/replay_traffic.py --target http://127.0.0.1:5000 --speedup 10
+    python tools/replay_traffic.py --with-fake-cuckoo --cuckoo-latency 0.5 --cuckoo-failure-rate 0.05
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+LOG_DIR = 'storage/logs/ids'
+STORAGE_DIR = 'storage/encrypted_files'
+
+# Same layout as the access logger in server/app.py; request lines are "METHOD /path".
+# The ip field is the raw X-Forwarded-For value, so it may be a chain
+# ("1.2.3.4, 10.0.0.9") or "None" when the client address was unknown.
+_LOG_LINE_RE = re.compile(
+    r'(?P<timestamp>^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - '
+    r'(?P<level>\w+) - '
+    r'(?P<ip>.+?) - '
+    r'(?P<method>GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS) (?P<path>/.*)$'
+)
+# Any record in the access log format. Requests are logged at INFO; other levels
+# are the app's own messages (e.g. "404 Not Found: /x") and are not requests.
+_LOG_RECORD_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - (?P<level>\w+) - ')
+
+# Share of 429 responses above which the report warns that quotas, not the
+# server, shaped the results
+_THROTTLED_WARN_SHARE = 0.05
+
+# Collapses IDs so the report groups by endpoint, not by object
+_ENDPOINT_RULES = [
+    (re.compile(r'^/api/file/download/.+$'), '/api/file/download/<id>'),
+    (re.compile(r'^/api/ids/report/.+$'), '/api/ids/report/<task_id>'),
+    (re.compile(r'^/static/.+$'), '/static/*'),
+]
+
+DOWNLOAD_PREFIX = '/api/file/download/'
+UPLOAD_PATH = '/api/upload'
+
+# Fallback upload size distribution when storage is empty: median ~256 KiB
+_FALLBACK_MEDIAN = 256 * 1024
+_FALLBACK_SIGMA = 1.5
+
+
+def endpoint_of(path):
+    for pattern, name in _ENDPOINT_RULES:
+        if pattern.match(path):
+            return name
+    return path
+
+
+def log_files(log_dir):
+    """Current and rotated access logs, oldest first (access.log.3 ... access.log)."""
+    base = os.path.join(log_dir, 'access.log')
+    rotated = [p for p in glob.glob(f"{base}.*") if p.rsplit('.', 1)[1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    return rotated + ([base] if os.path.exists(base) else [])
+
+
+def client_ip(forwarded):
+    """The originating client of a logged X-Forwarded-For value, or None if unknown."""
+    first_hop = forwarded.split(',', 1)[0].strip()
+    return None if first_hop in ('', 'None') else first_hop
+
+
+def parse_access_logs(paths):
+    """
+    Returns ([(seconds, ip, method, path)] sorted by time, number of skipped lines).
+
+    `ip` is the first hop of the logged address, or None. Non-empty lines that
+    are neither request lines nor the app's own non-INFO messages are counted as
+    skipped, so a format change that drops most of the traffic is visible
+    instead of silently shrinking the replay.
+    """
+    entries = []
+    skipped = 0
+    for path in paths:
+        with open(path, 'r', errors='replace') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                match = _LOG_LINE_RE.match(line)
+                if not match:
+                    record = _LOG_RECORD_RE.match(line)
+                    if line.strip() and not (record and record.group('level') != 'INFO'):
+                        skipped += 1
+                    continue
+                ts = datetime.strptime(match.group('timestamp'), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+                entries.append((ts, client_ip(match.group('ip')), match.group('method'), match.group('path')))
+    entries.sort(key=lambda e: e[0])
+    return entries, skipped
+
+
+class PayloadFactory:
+    """Synthesizes upload bodies of realistic sizes, each with a unique SHA-256."""
+
+    def __init__(self, storage_dir, max_size):
+        self.max_size = max_size
+        self.sizes = self._observed_sizes(storage_dir)
+        # One random buffer sliced per upload; random bytes are incompressible like real ciphertext
+        self._buffer = os.urandom(max_size)
+
+    def _observed_sizes(self, storage_dir):
+        sizes = []
+        for dirpath, _dirnames, filenames in os.walk(storage_dir):
+            for name in filenames:
+                if name.endswith('.hstc') or name.endswith('.data'):
+                    sizes.append(min(self.max_size, os.path.getsize(os.path.join(dirpath, name))))
+        return sizes
+
+    def next_size(self):
+        if self.sizes:
+            return random.choice(self.sizes)
+        size = int(random.lognormvariate(math.log(_FALLBACK_MEDIAN), _FALLBACK_SIGMA))
+        return max(1, min(self.max_size, size))
+
+    def make(self):
+        size = self.next_size()
+        # Unique prefix so the IDS hash checks see distinct files
+        prefix = os.urandom(16)
+        return prefix + self._buffer[:max(0, size - len(prefix))]
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self.max_start_lag = defaultdict(float)
+        self.max_lag = 0.0
+
+    def record(self, endpoint, status, latency, start_lag):
+        """`latency` runs from the scheduled send time; `start_lag` is how late the send began."""
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            # 429s come from per-client quotas, not server failures; counted apart
+            if status == 429:
+                self.throttled[endpoint] += 1
+            elif status == 'exception' or status >= 400:
+                self.errors[endpoint] += 1
+            self.max_start_lag[endpoint] = max(self.max_start_lag[endpoint], start_lag)
+            self.max_lag = max(self.max_lag, start_lag)
+
+    def summary(self, elapsed):
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            report[endpoint] = {
+                'requests': len(values),
+                'rps': len(values) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p90_ms': percentile(values, 0.90) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': values[-1] * 1000,
+                'max_start_lag_ms': self.max_start_lag[endpoint] * 1000,
+                'error_rate': self.errors[endpoint] / len(values),
+                'throttled_rate': self.throttled[endpoint] / len(values),
+                'statuses': {str(k): v for k, v in self.statuses[endpoint].items()},
+            }
+        return report
+
+
+class Replayer:
+    def __init__(self, target, payloads, stats, remap_downloads=True, timeout=60):
+        self.target = target.rstrip('/')
+        self.payloads = payloads
+        self.stats = stats
+        self.remap_downloads = remap_downloads
+        self.timeout = timeout
+        self._local = threading.local()
+        self._uploaded_ids = []
+        self._ids_lock = threading.Lock()
+        self._upload_count = 0
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _download_path(self, path):
+        if self.remap_downloads:
+            with self._ids_lock:
+                if self._uploaded_ids:
+                    return DOWNLOAD_PREFIX + random.choice(self._uploaded_ids)
+        return path
+
+    def send(self, due, ip, method, path):
+        """Sends one request that was scheduled for perf_counter() time `due`."""
+        endpoint = endpoint_of(path)
+        headers = {'X-Forwarded-For': ip} if ip else {}
+        kwargs = {}
+        if method == 'POST' and path == UPLOAD_PATH:
+            with self._ids_lock:
+                self._upload_count += 1
+                name = f"loadtest-{self._upload_count}.bin"
+            kwargs['files'] = {'file': (name, self.payloads.make())}
+        elif path.startswith(DOWNLOAD_PREFIX):
+            path = self._download_path(path)
+
+        # Time spent waiting for a free worker counts towards latency: a real
+        # client would have sent the request at `due` regardless
+        start_lag = max(0.0, time.perf_counter() - due)
+        try:
+            response = self._session().request(method, self.target + path, headers=headers,
+                                               timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.stats.record(endpoint, 'exception', time.perf_counter() - due, start_lag)
+            return
+        self.stats.record(endpoint, response.status_code, time.perf_counter() - due, start_lag)
+
+        if path == UPLOAD_PATH and response.status_code == 201:
+            try:
+                envelope_id = response.json().get('envelope_id')
+            except ValueError:
+                envelope_id = None
+            if envelope_id:
+                with self._ids_lock:
+                    self._uploaded_ids.append(envelope_id)
+
+
+def replay(entries, replayer, speedup, workers):
+    """
+    Dispatches entries on their (sped-up) original schedule. Returns elapsed seconds.
+
+    The pool queue is unbounded, so submitting never blocks and the schedule is
+    kept even when every worker is busy; the backlog shows up as start lag and
+    in the latencies, which Replayer.send() measures from each entry's due time.
+    """
+    if not entries:
+        return 0.0
+    first_ts = entries[0][0]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ts, ip, method, path in entries:
+            due = started + (ts - first_ts) / speedup
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(replayer.send, due, ip, method, path)
+    return time.perf_counter() - started
+
+
+def throttled_share(report):
+    """Fraction of all replayed requests answered with 429."""
+    total = sum(row['requests'] for row in report.values())
+    throttled = sum(row['statuses'].get('429', 0) for row in report.values())
+    return throttled / total if total else 0.0
+
+
+def print_report(report, elapsed, max_lag, skipped=0):
+    print(f"\nReplayed in {elapsed:.1f}s (max start lag {max_lag * 1000:.0f} ms, "
+          f"{skipped} unparsed log line(s) skipped)")
+    print("Latencies run from each request's scheduled send time and include start lag.\n")
+    header = (f"{'endpoint':<32} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'lag ms':>8} {'errors':>7} {'429s':>7}")
+    print(header)
+    print('-' * len(header))
+    for endpoint, row in report.items():
+        print(f"{endpoint[:32]:<32} {row['requests']:>6} {row['rps']:>8.2f} {row['p50_ms']:>8.1f} "
+              f"{row['p90_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} "
+              f"{row['max_start_lag_ms']:>8.1f} {row['error_rate']:>7.1%} {row['throttled_rate']:>7.1%}")
+    print("\nStatus codes:")
+    for endpoint, row in report.items():
+        codes = ', '.join(f"{code}: {count}" for code, count in sorted(row['statuses'].items()))
+        print(f"  {endpoint}: {codes}")
+
+    share = throttled_share(report)
+    if share > _THROTTLED_WARN_SHARE:
+        print(f"\nWARNING: {share:.0%} of requests were rejected by per-client quotas (429).\n"
+              "The server is probably counting every replayed request against this host's\n"
+              "address; restart it with TRUSTED_PROXY_HOPS=1 so X-Forwarded-For is honoured.\n"
+              "Latency and error figures above do not reflect the recorded traffic.")
+
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay access-log traffic against a running server.")
+    parser.add_argument('--target', default='http://127.0.0.1:5000')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--storage-dir', default=STORAGE_DIR,
+                        help="sample upload sizes from objects stored here")
+    parser.add_argument('--speedup', type=positive_float, default=1.0, help="divide recorded inter-arrival times by this")
+    parser.add_argument('--limit', type=int, default=0, help="replay at most this many requests")
+    parser.add_argument('--workers', type=int, default=64, help="maximum concurrent requests")
+    parser.add_argument('--max-upload-size', type=int, default=16 * 1024 * 1024)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--no-remap-downloads', action='store_true',
+                        help="request the logged download IDs instead of IDs from replayed uploads")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    parser.add_argument('--with-fake-cuckoo', action='store_true',
+                        help="start the fake Cuckoo sandbox (tools/fake_cuckoo.py) in-process")
+    parser.add_argument('--cuckoo-port', type=int, default=8090)
+    parser.add_argument('--cuckoo-latency', type=float, default=0.2)
+    parser.add_argument('--cuckoo-jitter', type=float, default=0.05)
+    parser.add_argument('--cuckoo-failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.with_fake_cuckoo:
+        from fake_cuckoo import start_fake_cuckoo
+        start_fake_cuckoo(port=args.cuckoo_port, latency=args.cuckoo_latency,
+                          jitter=args.cuckoo_jitter, failure_rate=args.cuckoo_failure_rate)
+        print(f"Fake Cuckoo running on port {args.cuckoo_port}")
+
+    paths = log_files(args.log_dir)
+    entries, skipped = parse_access_logs(paths)
+    if args.limit:
+        entries = entries[:args.limit]
+    if not entries:
+        print(f"No requests found in {args.log_dir}")
+        raise SystemExit(1)
+
+    span = entries[-1][0] - entries[0][0]
+    print(f"Loaded {len(entries)} requests from {len(paths)} log file(s), "
+          f"spanning {span:.0f}s; replaying in ~{span / args.speedup:.0f}s against {args.target}")
+    if skipped:
+        print(f"Skipped {skipped} log line(s) that are not request lines")
+
+    stats = Stats()
+    replayer = Replayer(args.target, PayloadFactory(args.storage_dir, args.max_upload_size), stats,
+                        remap_downloads=not args.no_remap_downloads, timeout=args.timeout)
+    elapsed = replay(entries, replayer, args.speedup, args.workers)
+    report = stats.summary(elapsed)
+    print_report(report, elapsed, stats.max_lag, skipped)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'elapsed_seconds': elapsed, 'max_start_lag_seconds': stats.max_lag,
+                       'skipped_log_lines': skipped, 'throttled_share': throttled_share(report),
+                       'endpoints': report}, f, indent=4)